@@ -1,23 +1,176 @@
 import requests
+import requests_cache
+import httpx
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Optional, List, Dict
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from datetime import datetime
+from collections import defaultdict
+from datetime import timedelta
+from functools import lru_cache
+from itertools import chain
+from operator import itemgetter
+import asyncio
+import os
 import random
+import re
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    # orjson is an optional C speedup; stdlib json decodes the same payloads
+    import json
+    _loads = json.loads
+
+# Matches both artwork sizes the feeds hand out, so one C-level pass replaces
+# the repeated "in + replace" substring scans at every call site
+_THUMB_RE = re.compile(r"(?:100x100|170x170)bb")
+
+def _upscale(u: str) -> str:
+    """Rewrite a feed artwork URL to its 600x600 variant."""
+    return _THUMB_RE.sub("600x600bb", u) if u else u
+
+# iTunes releaseDate is a fixed-width ISO-8601 string (YYYY-MM-DDTHH:MM:SSZ),
+# so the month/year can be sliced out directly; indexing this table avoids a
+# tz-aware datetime build plus a locale-aware strftime("%B") per track
+_MONTHS = ("", "January", "February", "March", "April", "May", "June",
+           "July", "August", "September", "October", "November", "December")
+
+# One C-level unpack per accepted track instead of six .get() method calls
+_TRACK_FIELDS = itemgetter("trackName", "releaseDate", "previewUrl",
+                           "trackNumber", "trackId", "artworkUrl100")
+
+def _reservoir(iterable, k: int, key=itemgetter("thumbnail")) -> List:
+    """Reservoir-sample up to k non-empty key values in a single pass.
+
+    O(n) time and O(k) memory, so the _with_thumbnails methods can sample
+    straight off the result list without building an intermediate thumbnail
+    list for random.sample to walk again."""
+    sample = []
+    seen = 0
+    for item in iterable:
+        value = key(item)
+        if not value:
+            continue
+        if seen < k:
+            sample.append(value)
+        else:
+            j = int(random.random() * (seen + 1))
+            if j < k:
+                sample[j] = value
+        seen += 1
+    return sample
+
+class _EmptyCatalog(Exception):
+    """Raised inside the memoized catalog fetch when an artist can't be resolved,
+    so lru_cache never caches a not-found/transient-failure result; the public
+    callers convert it back to the empty response."""
+
+def _parse_rss_entry(entry: Dict, rank: int) -> Dict:
+    """Parse one top-songs RSS entry into the song dict shared by the global
+    and per-country chart methods."""
+    images = entry.get("im:image", [])
+    return {
+        "rank": rank,
+        "song_name": entry.get("im:name", {}).get("label"),
+        "artist_name": entry.get("im:artist", {}).get("label"),
+        "thumbnail": _upscale(images[-1].get("label", "")) if images else None,
+        "preview_url": next(
+            (l["attributes"]["href"] for l in entry.get("link", [])
+             if isinstance(l, dict) and l.get("attributes", {}).get("type") == "audio/x-m4a"),
+            None
+        )
+    }
+
+def _make_session() -> requests.Session:
+    """Build a shared keep-alive session so every iTunes call reuses pooled sockets
+    instead of paying a fresh TCP+TLS handshake per request.
+
+    The session is backed by an on-disk TTL cache: the RSS charts only change
+    daily and artist/album lookups are deterministic, so repeat calls skip the
+    network entirely."""
+    session = requests_cache.CachedSession(
+        cache_name="itunes",
+        backend="sqlite",
+        expire_after=timedelta(hours=6),
+        allowable_methods=("GET",),
+        urls_expire_after={
+            "*/rss/topsongs/*": 3600,   # charts refresh daily; re-check hourly
+            "*/lookup*": 86400          # catalog lookups are stable for a day
+        }
+    )
+    # Transient 429/5xx responses are retried with backoff at the pool level,
+    # so a rate-limited lookup no longer silently drops whole albums
+    adapter = HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=32,
+        pool_block=False,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+            respect_retry_after_header=True
+        )
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "Connection": "keep-alive",
+        "User-Agent": "HanyaMusic-API/3.0"
+    })
+    return session
+
+def _make_async_client() -> httpx.AsyncClient:
+    """Single multiplexed HTTP/2 connection for the album fan-out: every album
+    lookup rides the same TLS handshake as a concurrent stream, and coroutine
+    frames replace per-worker thread stacks."""
+    return httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=1, max_keepalive_connections=1),
+        headers={"User-Agent": "HanyaMusic-API/3.0"}
+    )
 
 class ITunes:
     BASE_URL = "https://itunes.apple.com"
 
+    # Shared across all instances so the album fan-out reuses warm HTTPS sockets
+    _session = _make_session()
+
+    # Concurrency cap for the async fan-out; the old thread-pool sizing knob
+    # still applies so ops can match it to the backend's real sweet spot
+    _MAX_CONCURRENCY = int(os.getenv("ITUNES_MAX_WORKERS", (os.cpu_count() or 4) * 5))
+
     def __init__(self, country: str = "US", timeout: int = 10):
         self.country = country
         self.timeout = timeout
 
+    def prefetch_host(self) -> None:
+        """Warm DNS and the TLS session with a HEAD request, so batch workloads
+        (e.g. looping over many country codes) skip the handshake on the first
+        real call."""
+        try:
+            self._session.head(self.BASE_URL, timeout=(3.05, self.timeout))
+        except (requests.RequestException, ValueError) as e:
+            print(f"Prefetch failed: {e}")
+
     def _get(self, endpoint: str, params: Dict) -> Dict:
         url = f"{self.BASE_URL}/{endpoint}"
         try:
-            response = requests.get(url, params=params, timeout=self.timeout)
+            response = self._session.get(url, params=params, timeout=(3.05, self.timeout))
             response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            return _loads(response.content)
+        except (requests.RequestException, ValueError) as e:
+            print(f"Request failed: {e}")
+            return {}
+
+    async def _get_h2(self, client: httpx.AsyncClient, endpoint: str, params: Dict) -> Dict:
+        url = f"{self.BASE_URL}/{endpoint}"
+        try:
+            response = await client.get(url, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            return _loads(response.content)
+        except (httpx.HTTPError, ValueError) as e:
             print(f"Request failed: {e}")
             return {}
 
@@ -34,11 +187,16 @@ class ITunes:
             return results[0].get("artistId")
         return None
 
-    def get_all_official_songs_by_artist(self, artist_name: str) -> List[Dict]:
+    # Memoize the parsed result so repeat calls for the same artist skip the
+    # dict-building and sort loops, not just the HTTP (which CachedSession covers)
+    @lru_cache(maxsize=512)
+    def _fetch_artist_catalog(self, artist_name: str) -> tuple:
+        """Fetch an artist's catalog and derive the flat song list, the per-album
+        grouping, and 3 reservoir-sampled thumbnails in a single pass."""
         artist_id = self.get_artist_id(artist_name)
         if not artist_id:
             print(f"Artist '{artist_name}' not found.")
-            return []
+            raise _EmptyCatalog(artist_name)
 
         # Step 1: Get all albums
         params = {"id": artist_id, "entity": "album", "limit": 200, "country": self.country}
@@ -49,55 +207,103 @@ class ITunes:
             if r.get("collectionType") == "Album" and r.get("artistId") == artist_id
         ]
 
-        # Sort albums newest-first
-        albums.sort(key=lambda x: x.get("releaseDate", ""), reverse=True)
+        # An empty album list is indistinguishable from a failed lookup (_get
+        # degrades to {}), so don't memoize it either
+        if not albums:
+            raise _EmptyCatalog(artist_name)
 
-        all_songs = []
-
-        def fetch_album_tracks(album):
+        async def fetch_album_tracks(client, semaphore, album):
             album_id = album["collectionId"]
             album_name = album["collectionName"]
 
             params = {"id": album_id, "entity": "song", "limit": 200, "country": self.country}
-            tracks_data = self._get("lookup", params)
+            async with semaphore:
+                tracks_data = await self._get_h2(client, "lookup", params)
 
             tracks = []
             for t in tracks_data.get("results", []):
-                if t.get("wrapperType") == "track" and t.get("artistId") == artist_id:
-                    release_iso = t.get("releaseDate")
-                    release_dt = datetime.fromisoformat(release_iso.replace("Z", "+00:00"))
-                    tracks.append({
-                        "song_name": t.get("trackName"),
-                        "album_name": album_name,
-                        "release_date": release_iso,
-                        "release_month": release_dt.strftime("%B"),
-                        "release_year": release_dt.year,
-                        "preview_url": t.get("previewUrl"),
-                        "track_number": t.get("trackNumber"),
-                        "track_id": t.get("trackId"),
-                        "thumbnail": t.get("artworkUrl100").replace("100x100bb", "600x600bb")
-                    })
-
-            # Sort tracks newest-first
-            tracks.sort(key=lambda x: x["release_date"], reverse=True)
+                if t.get("wrapperType") != "track" or t.get("artistId") != artist_id:
+                    continue
+                try:
+                    name, release_iso, preview, track_no, track_id, artwork = _TRACK_FIELDS(t)
+                except KeyError:
+                    # Rare malformed row; take the tolerant path only when needed
+                    name, release_iso, preview, track_no, track_id, artwork = (
+                        t.get("trackName"), t.get("releaseDate"), t.get("previewUrl"),
+                        t.get("trackNumber"), t.get("trackId"), t.get("artworkUrl100")
+                    )
+                release_iso = release_iso or ""
+                tracks.append({
+                    "song_name": name,
+                    "album_name": album_name,
+                    "release_date": release_iso,
+                    "release_month": _MONTHS[int(release_iso[5:7])] if release_iso else None,
+                    "release_year": int(release_iso[:4]) if release_iso else None,
+                    "preview_url": preview,
+                    "track_number": track_no,
+                    "track_id": track_id,
+                    "thumbnail": _upscale(artwork or "")
+                })
+
             return tracks
 
-        # Fetch albums concurrently
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            future_to_album = {executor.submit(fetch_album_tracks, album): album for album in albums}
-            for future in as_completed(future_to_album):
-                all_songs.extend(future.result())
+        # Fetch albums concurrently on one event loop: a single multiplexed
+        # HTTP/2 connection carries every lookup, and chaining the per-album
+        # lists lets CPython size the result once
+        async def gather_tracks():
+            semaphore = asyncio.Semaphore(self._MAX_CONCURRENCY)
+            async with _make_async_client() as client:
+                return await asyncio.gather(
+                    *(fetch_album_tracks(client, semaphore, album) for album in albums)
+                )
+
+        all_songs = list(chain.from_iterable(asyncio.run(gather_tracks())))
+
+        # Final sort newest-first (ISO-8601 sorts correctly as plain strings)
+        all_songs.sort(key=itemgetter("release_date"), reverse=True)
+
+        # Single fused pass: group by album and reservoir-sample 3 thumbnails
+        # while walking the sorted list, instead of three O(N) traversals
+        albums_dict = defaultdict(list)
+        sample_thumbnails = []
+        seen_thumbs = 0
+        for song in all_songs:
+            albums_dict[song["album_name"]].append({
+                "song_name": song["song_name"],
+                "release_date": song["release_date"],
+                "release_month": song["release_month"],
+                "release_year": song["release_year"],
+                "thumbnail": song["thumbnail"],
+                "preview_url": song["preview_url"],
+            })
+            thumbnail = song["thumbnail"]
+            if thumbnail:
+                if seen_thumbs < 3:
+                    sample_thumbnails.append(thumbnail)
+                else:
+                    j = int(random.random() * (seen_thumbs + 1))
+                    if j < 3:
+                        sample_thumbnails[j] = thumbnail
+                seen_thumbs += 1
+
+        return all_songs, albums_dict, sample_thumbnails
+
+    def get_all_official_songs_by_artist(self, artist_name: str) -> List[Dict]:
+        try:
+            # Shallow copy so callers mutating the result can't corrupt the cache
+            return list(self._fetch_artist_catalog(artist_name)[0])
+        except _EmptyCatalog:
+            return []
 
-        # Final sort newest-first
-        all_songs.sort(key=lambda x: x["release_date"], reverse=True)
-        return all_songs
-    
     def get_artist_songs_with_sample_thumbnails(self, artist_name: str) -> Dict:
         """
         Get all songs by an artist with additional sample thumbnail URLs for 3 random songs
         """
-        all_songs = self.get_all_official_songs_by_artist(artist_name)
-        
+        try:
+            all_songs, albums_dict, sample_thumbnails = self._fetch_artist_catalog(artist_name)
+        except _EmptyCatalog:
+            all_songs, albums_dict, sample_thumbnails = [], {}, []
+
         if not all_songs:
             return {
                 "artist": artist_name,
@@ -105,40 +311,15 @@ class ITunes:
                 "albums": {},
                 "sample_thumbnails": []
             }
-        
-        # Group songs by album
-        albums_dict = {}
-        for song in all_songs:
-            album = song["album_name"]
-            song_info = {
-                "song_name": song["song_name"],
-                "release_date": song["release_date"],
-                "release_month": song["release_month"],
-                "release_year": song["release_year"],
-                "thumbnail": song.get("thumbnail"),
-                "preview_url": song.get("preview_url"),
-            }
-            if album not in albums_dict:
-                albums_dict[album] = []
-            albums_dict[album].append(song_info)
-        
-        # Select 3 random songs for sample thumbnails
-        sample_thumbnails = []
-        if len(all_songs) >= 3:
-            random_songs = random.sample(all_songs, 3)
-            for song in random_songs:
-                sample_thumbnails.append(song["thumbnail"])
-        else:
-            # If fewer than 3 songs, use all available
-            for song in all_songs:
-                sample_thumbnails.append(song["thumbnail"])
-        
+
+        # Shallow copies: handing out the cached defaultdict would let a
+        # missing-key read (or any mutation) silently write into the cache
         return {
             "artist": artist_name,
             "total_songs": len(all_songs),
             "total_albums": len(albums_dict),
-            "albums": albums_dict,
-            "sample_thumbnails": sample_thumbnails
+            "albums": dict(albums_dict),
+            "sample_thumbnails": list(sample_thumbnails)
         }
     
     ## Get all top global artists 
@@ -146,12 +327,15 @@ class ITunes:
         """
         Get top global artists based on top songs feed (deduplicated) with high-res thumbnails.
         """
-        url = f"https://itunes.apple.com/us/rss/topsongs/limit=200/json"  # fetch more to get enough unique artists
+        # Fetch ~2x the requested limit for dedup headroom, capped at the feed
+        # max, so small limits stop forcing the largest RSS payload
+        feed_limit = min(200, max(limit * 2, 10))
+        url = f"https://itunes.apple.com/us/rss/topsongs/limit={feed_limit}/json"
         try:
-            response = requests.get(url, timeout=self.timeout)
+            response = self._session.get(url, timeout=(3.05, self.timeout))
             response.raise_for_status()
-            data = response.json()
-        except requests.RequestException as e:
+            data = _loads(response.content)
+        except (requests.RequestException, ValueError) as e:
             print(f"Request failed: {e}")
             return []
 
@@ -160,10 +344,14 @@ class ITunes:
 
         entries = data.get("feed", {}).get("entry", [])
         for entry in entries:
+            # Stop before doing any per-entry work once we have enough artists
+            if len(artists) >= limit:
+                break
+
             artist_info = entry.get("im:artist", {})
             name = artist_info.get("label")
             artist_link = artist_info.get("attributes", {}).get("href")
-            
+
             if not name or name in seen_artists:
                 continue
 
@@ -171,13 +359,7 @@ class ITunes:
 
             # thumbnail
             images = entry.get("im:image", [])
-            thumbnail = None
-            if images:
-                thumbnail = images[-1].get("label", "")
-                if "100x100bb" in thumbnail:
-                    thumbnail = thumbnail.replace("100x100bb", "600x600bb")
-                elif "170x170bb" in thumbnail:
-                    thumbnail = thumbnail.replace("170x170bb", "600x600bb")
+            thumbnail = _upscale(images[-1].get("label", "")) if images else None
 
             artists.append({
                 "rank": len(artists) + 1,
@@ -185,9 +367,6 @@ class ITunes:
                 "thumbnail": thumbnail
             })
 
-            if len(artists) >= limit:
-                break
-
         return artists
     
     def get_top_global_artists_with_thumbnails(self, limit: int = 100) -> Dict:
@@ -203,16 +382,9 @@ class ITunes:
                 "sample_thumbnails": []
             }
         
-        # Extract thumbnail URLs from all artists (filter out None)
-        all_thumbnails = [artist["thumbnail"] for artist in artists if artist["thumbnail"]]
-        
-        # Select 3 random thumbnails
-        sample_thumbnails = []
-        if len(all_thumbnails) >= 3:
-            sample_thumbnails = random.sample(all_thumbnails,3)
-        else:
-            sample_thumbnails = all_thumbnails
-        
+        # Sample 3 thumbnails in one pass over the artists
+        sample_thumbnails = _reservoir(artists, 3)
+
         return {
             "total_artists": len(artists),
             "artists": artists,
@@ -223,51 +395,15 @@ class ITunes:
     def get_top_global_songs(self, limit: int = 200) -> List[Dict]:
         url = f"https://itunes.apple.com/us/rss/topsongs/limit={limit}/json"
         try:
-            response = requests.get(url, timeout=self.timeout)
+            response = self._session.get(url, timeout=(3.05, self.timeout))
             response.raise_for_status()
-            data = response.json()
-        except requests.RequestException as e:
+            data = _loads(response.content)
+        except (requests.RequestException, ValueError) as e:
             print(f"Request failed: {e}")
             return []
 
-        songs = []
         entries = data.get("feed", {}).get("entry", [])
-        for idx, entry in enumerate(entries, start=1):
-            song_name = entry.get("im:name", {}).get("label")
-            artist_info = entry.get("im:artist", {})
-            artist_name = artist_info.get("label")
-            artist_link = artist_info.get("attributes", {}).get("href")
-            song_link = entry.get("id", {}).get("label")
-            thumbnail = None
-            preview_url = None
-
-            # Get highest-resolution image from feed
-            images = entry.get("im:image", [])
-            if images:
-                thumbnail = images[-1].get("label", "")
-                if "100x100bb" in thumbnail:
-                    thumbnail = thumbnail.replace("100x100bb", "600x600bb")
-                elif "170x170bb" in thumbnail:
-                    thumbnail = thumbnail.replace("170x170bb", "600x600bb")
-
-            # Get preview URL
-            links = entry.get("link", [])
-            if isinstance(links, list):
-                for l in links:
-                    attributes = l.get("attributes", {})
-                    if attributes.get("type") == "audio/x-m4a":
-                        preview_url = attributes.get("href")
-                        break
-
-            songs.append({
-                "rank": idx,
-                "song_name": song_name,
-                "artist_name": artist_name,
-                "thumbnail": thumbnail,
-                "preview_url": preview_url
-            })
-
-        return songs
+        return [_parse_rss_entry(entry, idx) for idx, entry in enumerate(entries, start=1)]
     
     def get_top_global_songs_with_thumbnails(self, limit: int = 100) -> Dict:
         """
@@ -282,16 +418,9 @@ class ITunes:
                 "sample_thumbnails": []
             }
         
-        # Extract thumbnail URLs from all songs (filter out None)
-        all_thumbnails = [song["thumbnail"] for song in songs if song["thumbnail"]]
-        
-        # Select 5 random thumbnails
-        sample_thumbnails = []
-        if len(all_thumbnails) >= 3:
-            sample_thumbnails = random.sample(all_thumbnails, 3)
-        else:
-            sample_thumbnails = all_thumbnails
-        
+        # Sample 3 thumbnails in one pass over the songs
+        sample_thumbnails = _reservoir(songs, 3)
+
         return {
             "total_songs": len(songs),
             "songs": songs,
@@ -309,49 +438,15 @@ class ITunes:
         """
         url = f"https://itunes.apple.com/{country_code}/rss/topsongs/limit={limit}/json"
         try:
-            response = requests.get(url, timeout=self.timeout)
+            response = self._session.get(url, timeout=(3.05, self.timeout))
             response.raise_for_status()
-            data = response.json()
-        except requests.RequestException as e:
+            data = _loads(response.content)
+        except (requests.RequestException, ValueError) as e:
             print(f"Request failed: {e}")
             return []
 
-        songs = []
         entries = data.get("feed", {}).get("entry", [])
-        for idx, entry in enumerate(entries, start=1):
-            song_name = entry.get("im:name", {}).get("label")
-            artist_info = entry.get("im:artist", {})
-            artist_name = artist_info.get("label")
-            artist_link = artist_info.get("attributes", {}).get("href")
-            song_link = entry.get("id", {}).get("label")
-            thumbnail = None
-
-            images = entry.get("im:image", [])
-            if images:
-                thumbnail = images[-1].get("label", "")
-                if "100x100bb" in thumbnail:
-                    thumbnail = thumbnail.replace("100x100bb", "600x600bb")
-                elif "170x170bb" in thumbnail:
-                    thumbnail = thumbnail.replace("170x170bb", "600x600bb")
-
-            # Get preview URL
-            links = entry.get("link", [])
-            if isinstance(links, list):
-                for l in links:
-                    attributes = l.get("attributes", {})
-                    if attributes.get("type") == "audio/x-m4a":
-                        preview_url = attributes.get("href")
-                        break
-
-            songs.append({
-                "rank": idx,
-                "song_name": song_name,
-                "artist_name": artist_name,
-                "thumbnail": thumbnail,
-                "preview_url": preview_url
-            })
-
-        return songs
+        return [_parse_rss_entry(entry, idx) for idx, entry in enumerate(entries, start=1)]
     
     def get_top_country_songs_with_thumbnails(self, country_code: str = "us", limit: int = 100) -> Dict:
         """
@@ -367,16 +462,9 @@ class ITunes:
                 "sample_thumbnails": []
             }
         
-        # Extract thumbnail URLs from all songs (filter out None)
-        all_thumbnails = [song["thumbnail"] for song in songs if song["thumbnail"]]
-        
-        # Select 5 random thumbnails
-        sample_thumbnails = []
-        if len(all_thumbnails) >= 3:
-            sample_thumbnails = random.sample(all_thumbnails, 3)
-        else:
-            sample_thumbnails = all_thumbnails
-        
+        # Sample 3 thumbnails in one pass over the songs
+        sample_thumbnails = _reservoir(songs, 3)
+
         return {
             "country": country_code,
             "total_songs": len(songs),
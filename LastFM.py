@@ -1,8 +1,18 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
 from dotenv import load_dotenv
 from typing import List, Dict, Any, Optional
 
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    # orjson is an optional C speedup; stdlib json decodes the same payloads
+    import json
+    _loads = json.loads
+
 load_dotenv()
 
 class LastFMClient:
@@ -13,6 +23,26 @@ class LastFMClient:
         if not self.api_key:
             print("Warning: LASTFM_API_KEY not found in environment variables")
 
+        # Pooled keep-alive session so repeated chart calls skip the handshake
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=32,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(["GET"]),
+                respect_retry_after_header=True
+            )
+        )
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._session.headers.update({
+            "Connection": "keep-alive",
+            "User-Agent": "HanyaMusic-API/3.0"
+        })
+
     def get_global_top_artists(self, limit: int = 100) -> List[Dict[str, Any]]:
         """
         Fetch global top artists from Last.fm
@@ -28,14 +58,14 @@ class LastFMClient:
         }
 
         try:
-            response = requests.get(self.BASE_URL, params=params)
+            response = self._session.get(self.BASE_URL, params=params)
             response.raise_for_status()
-            data = response.json()
+            data = _loads(response.content)
             
             if "artists" in data and "artist" in data["artists"]:
                 return data["artists"]["artist"]
             return []
             
-        except requests.RequestException as e:
+        except (requests.RequestException, ValueError) as e:
             print(f"Error fetching data from Last.fm: {e}")
             return []